@@ -13,21 +13,42 @@
 # limitations under the License.
 
 # Standard
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
+import hashlib
 import importlib
 import os
+import threading
 from os import getenv
 
 # Third Party
 from sentence_transformers import SentenceTransformer
-from sentence_transformers.util import (
-    cos_sim,
-    dot_score,
-    normalize_embeddings,
-    semantic_search,
+from sentence_transformers.util import dot_score, semantic_search
+from torch import load as torch_load
+from torch import save as torch_save
+from torch import (
+    as_tensor,
+    autocast,
+    bfloat16,
+    cat,
+    compile,
+    cuda,
+    device,
+    empty,
+    float16,
+    inference_mode,
+    qint8,
+    set_num_interop_threads,
+    set_num_threads,
+    stack,
+    topk,
 )
-from torch import compile, cuda, device, inference_mode
+from torch.ao.quantization import quantize_dynamic
 from torch.backends import mps
+from torch.nn import Linear
+from torch.nn.functional import normalize as l2_normalize
+import numpy as np
 
 # First Party
 from caikit.core import ModuleBase, ModuleConfig, ModuleSaver, module
@@ -60,6 +81,28 @@ if os.environ.get(tokenizers_parallelism) is None:
 # For testing env vars
 FALSY = ("no", "n", "false", "0", "f", "off")
 
+# Pin the CPU thread counts so concurrent workers don't oversubscribe the cores.
+# EMBED_NUM_THREADS wins, otherwise the cores are split across GRPC_WORKERS.
+# When neither is set, the torch/OpenMP defaults are left alone.
+EMBED_NUM_THREADS = getenv("EMBED_NUM_THREADS")
+GRPC_WORKERS = getenv("GRPC_WORKERS")
+if EMBED_NUM_THREADS or GRPC_WORKERS:
+    num_threads = (
+        max(1, int(EMBED_NUM_THREADS))
+        if EMBED_NUM_THREADS
+        else max(1, (os.cpu_count() or 1) // max(1, int(GRPC_WORKERS)))
+    )
+    # Set before ipex (Intel OpenMP) is imported below
+    os.environ.setdefault("OMP_NUM_THREADS", str(num_threads))
+    os.environ.setdefault("KMP_AFFINITY", "granularity=fine,compact,1,0")
+    os.environ.setdefault("KMP_BLOCKTIME", "1")
+    set_num_threads(num_threads)
+    try:
+        set_num_interop_threads(1)
+    except RuntimeError as e:
+        # Only allowed before any inter-op parallel work has started, so just log and proceed.
+        logger.warn(f"Continuing without set_num_interop_threads(1) because it failed: {e}")
+
 # When IPEX_OPTIMIZE is not false, attempt to import the library and use it.
 IPEX_OPTIMIZE = getenv("IPEX_OPTIMIZE", "false").lower() not in FALSY
 if IPEX_OPTIMIZE:
@@ -81,9 +124,47 @@ else:
     USE_MPS = getenv(
         "USE_MPS", "false").lower() not in FALSY and mps.is_built() and mps.is_available()
 
+# When USE_INT8 is not false, use dynamic int8 quantization of the Linear layers (CPU only)
+USE_INT8 = getenv("USE_INT8", "false").lower() not in FALSY
+
+# When USE_BF16 is not false, run CPU inference with bfloat16 autocast (and bf16 ipex.optimize).
+# Not combined with USE_INT8 (the quantized Linear layers take float32 activations).
+USE_BF16 = getenv("USE_BF16", "false").lower() not in FALSY
+if USE_BF16 and USE_INT8:
+    USE_BF16 = False
+    logger.warn("USE_BF16 enabled in env, but skipping bfloat16 because USE_INT8 is also enabled "
+                "and the quantized Linear layers take float32 activations")
+
+# When USE_FP16 is not false, run CUDA inference with a float16 model and autocast
+USE_FP16 = getenv("USE_FP16", "false").lower() not in FALSY
+
 # torch.compile won't work everywhere, but when set to try we'll try it
 PT2_COMPILE = os.getenv("PT2_COMPILE", "false").lower() not in FALSY
 
+# When EMBED_CACHE is above 0, keep that many embeddings in each model's LRU cache for repeated
+# texts (on the model device). The default 0 disables caching.
+EMBED_CACHE = int(getenv("EMBED_CACHE", "0"))
+
+# When DOC_CACHE_DIR is set, rerank document embeddings are also kept there (as float16 files,
+# under a subdirectory per model artifacts and precision mode) so they survive restarts
+DOC_CACHE_DIR = getenv("DOC_CACHE_DIR")
+# Files are written in the background. Above DOC_CACHE_MAX_FILES per subdirectory, the least
+# recently used files are deleted (down to 90% of the cap). 0 means no cap.
+DOC_CACHE_MAX_FILES = int(getenv("DOC_CACHE_MAX_FILES", "100000"))
+# Persisted documents are also kept in the in-memory LRU (disk is only read on a memory miss,
+# e.g. after a restart). Its size is EMBED_CACHE if set, else DOC_CACHE_MEMORY documents.
+DOC_CACHE_MEMORY = int(getenv("DOC_CACHE_MEMORY", "10000"))
+# Requests' disk updates queued for the writer thread beyond this are dropped (the rows are
+# still cached in memory), so a busy writer can't pile up host memory
+DOC_CACHE_MAX_PENDING = 16
+
+# Rerank corpora up to this many documents are scored with one matmul and topk, larger ones
+# go through the chunked semantic_search
+RERANK_DIRECT_TOPK_MAX = int(getenv("RERANK_DIRECT_TOPK_MAX", "50000"))
+
+# Sequence lengths (in tokens) used to warm up torch.compile after loading
+WARMUP_SEQ_LENGTHS = (32, 64, 128, 256, 512)
+
 
 @module(
     "EEB12558-B4FA-4F34-A9FD-3F5890E9CD3F",
@@ -110,6 +191,18 @@ class TextEmbedding(ModuleBase):
         super().__init__()
         self.model = model
         self.model.eval()
+        # Cached for the per-request truncation checks
+        self._tokenizer = self.model.tokenizer
+        self._max_tokens = self.model.max_seq_length
+        # LRU cache of (text, normalized) -> embedding, shared by concurrent requests
+        self._embedding_cache = OrderedDict()
+        self._embedding_cache_lock = threading.Lock()
+        self._embedding_cache_size = EMBED_CACHE  # load() raises it for DOC_CACHE_DIR
+        # Set by load() when DOC_CACHE_DIR is set
+        self._doc_cache_dir = None
+        self._doc_cache_writer = None
+        self._doc_cache_files = 0  # Approximate, only updated by the writer thread
+        self._doc_cache_pending = 0  # Queued writer jobs, guarded by _embedding_cache_lock
 
     @classmethod
     def load(cls, model_path: str, *args, **kwargs) -> "TextEmbedding":
@@ -141,13 +234,69 @@ class TextEmbedding(ModuleBase):
         model = SentenceTransformer(model_name_or_path=artifacts_path, device=gpu)
         if gpu is not None:
             model.to(device(gpu))
+        if USE_FP16 and gpu == "cuda":
+            model.half()
         model = cls._optimize(model)
-        return cls(model)
+        embedding = cls(model)
+        if DOC_CACHE_DIR:
+            embedding._doc_cache_dir = os.path.join(
+                DOC_CACHE_DIR,
+                cls._doc_cache_subdir(config.model_path, artifacts_path, model.device.type),
+            )
+            os.makedirs(embedding._doc_cache_dir, exist_ok=True)
+            if EMBED_CACHE < 1:
+                embedding._embedding_cache_size = max(1, DOC_CACHE_MEMORY)
+            embedding._doc_cache_files = len(
+                [n for n in os.listdir(embedding._doc_cache_dir) if n.endswith(".pt")]
+            )
+            # One thread, so all writes and evictions are serialized
+            embedding._doc_cache_writer = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="doc-cache-writer"
+            )
+        # Only warm up if _optimize() actually installed a compiled forward
+        if PT2_COMPILE and "forward" in model.__dict__:
+            embedding._warmup()
+        return embedding
+
+    @staticmethod
+    def _doc_cache_subdir(model_path: str, artifacts_path: str, device_type: str) -> str:
+        """Name of the DOC_CACHE_DIR subdirectory for this model and precision mode.
+
+        Persisted embeddings are only valid for the same artifacts and numerics, so the name
+        holds a hash of every artifacts file's relative path, size and mtime (cheap, the
+        weights are not read) plus the active dtype/quantization mode.
+        """
+        digest = hashlib.sha256()
+        for root, dirs, files in os.walk(artifacts_path):
+            dirs.sort()  # Walk in a stable order
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                relpath = os.path.relpath(path, artifacts_path)
+                digest.update(f"{relpath}:{stat.st_size}:{stat.st_mtime_ns}\n".encode("utf-8"))
+
+        if USE_INT8 and device_type == "cpu":
+            precision = "int8"
+        elif USE_BF16 and device_type == "cpu":
+            precision = "bf16"
+        elif USE_FP16 and device_type == "cuda":
+            precision = "fp16"
+        else:
+            precision = "fp32"
+
+        model_name = os.path.basename(os.path.normpath(model_path))
+        return f"{model_name}-{digest.hexdigest()[:16]}-{precision}"
 
     @staticmethod
     def _optimize(model):
+        if USE_INT8:
+            if model.device.type == "cpu":
+                model = quantize_dynamic(model, {Linear}, dtype=qint8, inplace=True)
+            else:
+                logger.warn("USE_INT8 enabled in env, but skipping dynamic quantization "
+                            f"because it is only supported on CPU (device is {model.device})")
         if IPEX_OPTIMIZE:
-            model = ipex.optimize(model)
+            model = ipex.optimize(model, dtype=bfloat16 if USE_BF16 and not USE_XPU else None)
             backend = "ipex"
         elif USE_MPS:
             backend = mps
@@ -155,18 +304,49 @@ class TextEmbedding(ModuleBase):
             backend = "inductor"  # default backend
         if PT2_COMPILE:
             try:
-                model = compile(model, backend=backend, mode="max-autotune")
+                # Variable-length inputs would otherwise recompile for each new shape
+                dynamo = importlib.import_module("torch._dynamo")
+                dynamo.config.cache_size_limit = 64
+                # encode() calls self.forward() directly, so compile that (not __call__).
+                # Not "reduce-overhead": its CUDA graphs reuse output buffers across calls, but
+                # encode() keeps every batch's output around until the last batch is done.
+                model.forward = compile(
+                    model.forward,
+                    backend=backend,
+                    mode="default",
+                    dynamic=True,
+                    fullgraph=False,
+                )
             except Exception as e:
                 # Not always supported (e.g. in a python version) so catch, log, proceed.
                 logger.warn("PT2_COMPILE enabled in env, but continuing without torch.compile() "
                             f"because it failed with exception: {e}", exc_info=True)
         return model
 
+    def _warmup(self):
+        """Encode dummy inputs at a few sequence lengths to populate the torch.compile cache"""
+        seq_lengths = sorted(
+            {n for n in WARMUP_SEQ_LENGTHS if n < self._max_tokens} | {self._max_tokens}
+        )
+        try:
+            for n in seq_lengths:
+                # Same fixed (bucket) shapes as _encode_bucketed uses. Dynamo specializes size-1
+                # dims, so batch 1 (single texts) and batch 2 (the dynamic graph used for
+                # batches of 2..64) are separate graphs. With dynamic=True the lengths mostly
+                # collapse into those two graphs, the extra lengths only confirm no recompiles.
+                for batch_size in (1, 2):
+                    self._encode_padded(["warmup"] * batch_size, n)
+        except Exception as e:
+            # Compilation happens lazily, so failures show up here. Fall back to eager mode.
+            self.model.__dict__.pop("forward", None)
+            logger.warn("PT2_COMPILE enabled in env, but continuing without torch.compile() "
+                        f"because warmup failed with exception: {e}", exc_info=True)
+
     def _prevent_truncation(self, text):
-        tokenized = self.model[0].tokenizer(
-            text, return_attention_mask=False, return_token_type_ids=False)
-        tokens = len(tokenized.input_ids)
-        max_tokens = self.model.max_seq_length
+        tokens = self._tokenizer(
+            [text], return_attention_mask=False, return_token_type_ids=False, return_length=True
+        )["length"][0]
+        max_tokens = self._max_tokens
         error.value_check(
             "<NLP08391926E>",
             tokens <= max_tokens,
@@ -174,6 +354,332 @@ class TextEmbedding(ModuleBase):
             f" for this model ({tokens} > {max_tokens})."
         )
 
+    def _autocast(self):
+        """bfloat16 autocast on CPU or float16 autocast on CUDA when enabled (else a no-op)"""
+        device_type = self.model.device.type
+        use_bf16 = USE_BF16 and device_type == "cpu"
+        use_fp16 = USE_FP16 and device_type == "cuda"
+        return autocast(
+            device_type="cuda" if use_fp16 else "cpu",
+            dtype=float16 if use_fp16 else bfloat16,
+            enabled=use_bf16 or use_fp16,
+        )
+
+    def _encode(self, texts, **kwargs):
+        """Run model.encode() in inference mode (with autocast when enabled)
+
+        Returns:
+            float32 tensor of embeddings (converted back from bfloat16/float16 if needed)
+        """
+        with inference_mode(), self._autocast():
+            embeddings = self.model.encode(texts, convert_to_tensor=True, **kwargs)
+        return embeddings.float()
+
+    def _encode_padded(
+        self, texts: List[str], max_length: int, normalize_embeddings: bool = False
+    ):
+        """Encode texts padded to exactly max_length tokens, so each call has a fixed shape.
+
+        Same text preprocessing as encode() (strip, optional lower case), but padded (and
+        truncated) to max_length instead of to the longest text in the batch.
+
+        Returns:
+            float32 tensor of embeddings (converted back from bfloat16/float16 if needed)
+        """
+        texts = [str(text).strip() for text in texts]
+        if getattr(self.model[0], "do_lower_case", False):
+            texts = [text.lower() for text in texts]
+        features = self._tokenizer(
+            texts,
+            padding="max_length",
+            truncation="longest_first",
+            max_length=max_length,
+            return_tensors="pt",
+        )
+        target = self.model.device
+        features = {name: value.to(target) for name, value in features.items()}
+        with inference_mode(), self._autocast():
+            embeddings = self.model.forward(features)["sentence_embedding"]
+        embeddings = embeddings.float()
+        if normalize_embeddings:
+            embeddings = l2_normalize(embeddings, p=2, dim=1)
+        return embeddings
+
+    def _to_device(self, tensor):
+        """Return tensor contiguous on the model device for the scoring matmul (no-op move if
+        it is already there).
+
+        CPU to CUDA copies are staged through pinned memory so they can run asynchronously.
+        """
+        tensor = tensor.contiguous()
+        target = self.model.device
+        # encode() output is normally already on the model device, so only move when it isn't
+        if tensor.device != target:
+            if tensor.device.type == "cpu" and target.type == "cuda":
+                tensor = tensor.pin_memory()
+            tensor = tensor.to(target, non_blocking=True)
+        return tensor
+
+    @staticmethod
+    def _to_host(*tensors):
+        """Copy tensors to the CPU with a single synchronization.
+
+        CUDA tensors are copied asynchronously into pinned buffers (reused by torch's caching
+        host allocator) and we only wait once all the copies are queued.
+        """
+        if tensors[0].device.type != "cuda":
+            return [t.cpu() for t in tensors]
+
+        host_tensors = []
+        for t in tensors:
+            host = empty(t.shape, dtype=t.dtype, pin_memory=True)
+            host.copy_(t, non_blocking=True)
+            host_tensors.append(host)
+        cuda.current_stream(tensors[0].device).synchronize()
+        return host_tensors
+
+    def _prevent_truncation_batch(self, texts: List[str]) -> List[int]:
+        """Check all texts with one batched tokenizer call and return their token lengths"""
+        if len(texts) == 0:
+            return []
+
+        lengths = self._tokenizer(
+            texts, return_attention_mask=False, return_token_type_ids=False, return_length=True
+        )["length"]
+        tokens = max(lengths)
+        max_tokens = self._max_tokens
+        error.value_check(
+            "<NLP08391926E>",
+            tokens <= max_tokens,
+            f"Token sequence length is longer than the specified maximum sequence length"
+            f" for this model ({tokens} > {max_tokens})."
+        )
+        return lengths
+
+    def _encode_bucketed(
+        self,
+        texts: List[str],
+        lengths: Optional[List[int]] = None,
+        batch_size: int = 64,
+        normalize_embeddings: bool = False,
+    ):
+        """Encode texts grouped into power-of-two token length buckets.
+
+        Each batch is padded to its bucket size (capped at max_seq_length), so padding
+        stays within the bucket and the sequence dimension only takes a handful of values
+        (stable shapes for torch.compile). Embeddings are returned in the input order.
+
+        Args:
+            texts: List[str]
+                Input texts to be encoded
+            lengths: Optional[List[int]]
+                Token lengths of texts (e.g. from _prevent_truncation_batch) to avoid
+                tokenizing again
+            batch_size: int
+                Maximum number of texts per forward pass
+            normalize_embeddings: bool
+                L2-normalize the embeddings
+        Returns:
+            Tensor of embeddings, one row per input text (in order)
+        """
+        if len(texts) == 0:
+            return empty((0, self.model.get_sentence_embedding_dimension()))
+
+        if lengths is None:
+            lengths = self._tokenizer(
+                texts, return_attention_mask=False, return_token_type_ids=False, return_length=True
+            )["length"]
+
+        buckets = {}
+        for i, length in enumerate(lengths):
+            # Round up to the next power of two
+            buckets.setdefault(1 << max(0, length - 1).bit_length(), []).append(i)
+
+        order = []
+        bucket_embeddings = []
+        for bucket in sorted(buckets):
+            indices = buckets[bucket]
+            max_length = min(bucket, self._max_tokens)
+            for start in range(0, len(indices), batch_size):
+                batch = indices[start : start + batch_size]
+                bucket_embeddings.append(
+                    self._encode_padded(
+                        [texts[i] for i in batch],
+                        max_length,
+                        normalize_embeddings=normalize_embeddings,
+                    )
+                )
+                order.extend(batch)
+
+        embeddings = cat(bucket_embeddings)
+        inverse = as_tensor(np.argsort(order), device=embeddings.device)
+        return embeddings[inverse]
+
+    def _encode_cached(
+        self,
+        texts: List[str],
+        lengths: Optional[List[int]] = None,
+        persistent: range = range(0),
+        **kwargs,
+    ):
+        """Encode texts with _encode_bucketed, reusing cached embeddings of repeated texts.
+
+        Only texts missing from the cache (each once) are run through the model.
+
+        Args:
+            texts: List[str]
+                Input texts to be encoded
+            lengths: Optional[List[int]]
+                Token lengths of texts (e.g. from _prevent_truncation_batch)
+            persistent: range
+                Positions of texts (e.g. rerank documents) whose embeddings are also
+                kept on disk under DOC_CACHE_DIR, when set
+        Returns:
+            Tensor of embeddings, one row per input text (in order)
+        """
+        if self._doc_cache_dir is None:
+            persistent = range(0)
+        if (EMBED_CACHE < 1 and len(persistent) == 0) or len(texts) == 0:
+            return self._encode_bucketed(texts, lengths, **kwargs)
+
+        normalize = kwargs.get("normalize_embeddings", False)
+        keys = [(text, normalize) for text in texts]
+        # By key, not position: a document's text may also appear (first) as a query
+        persistent_keys = {keys[pos] for pos in persistent}
+        rows = {}
+        missing = {}  # key -> position of its first occurrence in texts
+        with self._embedding_cache_lock:
+            for pos, key in enumerate(keys):
+                if key in rows or key in missing:
+                    continue
+                row = self._embedding_cache.get(key)
+                if row is None:
+                    missing[key] = pos
+                else:
+                    self._embedding_cache.move_to_end(key)
+                    rows[key] = row
+
+        loaded_keys = []
+        for key in list(missing):
+            if key in persistent_keys:
+                row = self._load_persisted_embedding(key)
+                if row is not None:
+                    rows[key] = row
+                    del missing[key]
+                    loaded_keys.append(key)
+
+        if missing:
+            positions = list(missing.values())
+            encoded = self._encode_bucketed(
+                [texts[pos] for pos in positions],
+                [lengths[pos] for pos in positions] if lengths is not None else None,
+                **kwargs,
+            )
+            for key, row in zip(missing, encoded):
+                # Clone so the cache doesn't keep the whole batch tensor alive
+                rows[key] = row.clone()
+
+        new_keys = [key for key in missing if key in persistent_keys]
+        if (new_keys or loaded_keys) and self._reserve_doc_cache_write():
+            # One device to host copy for the whole batch, the files are written in the background
+            new_rows = (
+                stack([rows[key] for key in new_keys]).half().cpu() if new_keys else None
+            )
+            future = self._doc_cache_writer.submit(
+                self._update_persisted_embeddings, new_keys, new_rows, loaded_keys
+            )
+            future.add_done_callback(self._release_doc_cache_write)
+
+        # New rows and rows read back from disk. Without EMBED_CACHE only documents are kept.
+        cache_keys = list(missing) + loaded_keys
+        if EMBED_CACHE < 1:
+            cache_keys = [key for key in cache_keys if key in persistent_keys]
+        if cache_keys:
+            with self._embedding_cache_lock:
+                for key in cache_keys:
+                    self._embedding_cache[key] = rows[key]
+                    self._embedding_cache.move_to_end(key)
+                while len(self._embedding_cache) > self._embedding_cache_size:
+                    self._embedding_cache.popitem(last=False)
+
+        return stack([rows[key] for key in keys])
+
+    def _persisted_embedding_path(self, key) -> str:
+        text, normalize = key
+        # A stable digest (unlike hash()) so files can be found again after a restart
+        digest = hashlib.sha256(f"{int(normalize)}:{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self._doc_cache_dir, f"{digest}.pt")
+
+    def _load_persisted_embedding(self, key):
+        path = self._persisted_embedding_path(key)
+        if not os.path.isfile(path):
+            return None
+        try:
+            # weights_only: the directory may be shared, so never unpickle arbitrary objects
+            return torch_load(path, map_location=self.model.device, weights_only=True).float()
+        except Exception as e:
+            # A corrupt cache file is not fatal, the text is just encoded again
+            logger.warn(f"Ignoring unreadable embedding cache file {path}: {e}")
+            return None
+
+    def _reserve_doc_cache_write(self) -> bool:
+        """Reserve a writer queue slot (False means drop the update, the queue is full)"""
+        with self._embedding_cache_lock:
+            if self._doc_cache_pending >= DOC_CACHE_MAX_PENDING:
+                logger.debug("Dropping embedding cache file updates, writer queue is full")
+                return False
+            self._doc_cache_pending += 1
+            return True
+
+    def _release_doc_cache_write(self, future):
+        with self._embedding_cache_lock:
+            self._doc_cache_pending -= 1
+        if future.exception() is not None:
+            logger.warn(f"Embedding cache file update failed: {future.exception()}")
+
+    def _update_persisted_embeddings(self, new_keys, new_rows, loaded_keys):
+        """Write new embedding files, mark loaded ones as recently used and enforce
+        DOC_CACHE_MAX_FILES (runs on the writer thread)"""
+        for key in loaded_keys:
+            try:
+                os.utime(self._persisted_embedding_path(key))
+            except OSError:
+                pass  # Evicted in the meantime (e.g. by another process sharing the dir)
+
+        for key, row in zip(new_keys, new_rows if new_rows is not None else []):
+            path = self._persisted_embedding_path(key)
+            # Write to a temp file and rename so concurrent readers never see a partial file
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            try:
+                # Clone so only this row is saved, not the whole batch storage
+                torch_save(row.clone(), tmp_path)
+                os.replace(tmp_path, path)
+                self._doc_cache_files += 1
+            except OSError as e:
+                logger.warn(f"Skipping embedding cache file {path}: {e}")
+
+        if 0 < DOC_CACHE_MAX_FILES < self._doc_cache_files:
+            self._evict_persisted_embeddings()
+
+    def _evict_persisted_embeddings(self):
+        """Delete the least recently used files down to 90% of DOC_CACHE_MAX_FILES"""
+        entries = []
+        with os.scandir(self._doc_cache_dir) as it:
+            for entry in it:
+                if entry.name.endswith(".pt"):
+                    try:
+                        entries.append((entry.stat().st_mtime, entry.path))
+                    except OSError:
+                        pass
+        entries.sort()
+        excess = len(entries) - int(DOC_CACHE_MAX_FILES * 0.9)
+        for _, path in entries[: max(0, excess)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        self._doc_cache_files = len(entries) - max(0, excess)
+
     @EmbeddingTask.taskmethod()
     def run_embedding(self, text: str) -> Vector1D:  # pylint: disable=redefined-builtin
         """Get embedding for a string.
@@ -186,7 +692,7 @@ class TextEmbedding(ModuleBase):
         error.type_check("<NLP27491611E>", str, text=text)
 
         self._prevent_truncation(text)
-        return Vector1D.from_embeddings(self.model.encode(text))
+        return Vector1D.from_embeddings(self._encode(text).cpu().numpy())
 
     @EmbeddingTasks.taskmethod()
     def run_embeddings(
@@ -200,16 +706,15 @@ class TextEmbedding(ModuleBase):
             List[Vector1D]: List vectors. One for each input text (in order).
              Each vector is a list of floats (supports various float types).
         """
-        if isinstance(
-            texts, str
-        ):  # encode allows str, but the result would lack a dimension
-            texts = [texts]
-
-        for text in texts:
-            self._prevent_truncation(text)
-
-        embeddings = self.model.encode(texts)
-        results = [Vector1D.from_embeddings(e) for e in embeddings]
+        error.type_check("<NLP50617535E>", list, texts=texts)
+        if len(texts) == 0:
+            return ListOfVector1D(results=[])
+
+        lengths = self._prevent_truncation_batch(texts)
+        embeddings = self._encode_cached(texts, lengths).cpu().numpy()
+        # One contiguous float32 array, so each Vector1D wraps a zero-copy row view
+        embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+        results = [Vector1D.from_embeddings(embeddings[i]) for i in range(embeddings.shape[0])]
         return ListOfVector1D(results=results)
 
     @SentenceSimilarityTask.taskmethod()
@@ -225,14 +730,19 @@ class TextEmbedding(ModuleBase):
             SentenceScores
         """
 
-        self._prevent_truncation(source_sentence)
-        for s in sentences:
-            self._prevent_truncation(s)
+        texts = [source_sentence] + list(sentences)
+        lengths = self._prevent_truncation_batch(texts)
 
-        source_embedding = self.model.encode(source_sentence)
-        embeddings = self.model.encode(sentences)
+        # Encode the source sentence along with the sentences in one pass (normalized)
+        embeddings = self._to_device(
+            self._encode_cached(texts, lengths, normalize_embeddings=True)
+        )
+        source_embedding = embeddings[:1]
+        embeddings = embeddings[1:]
 
-        res = cos_sim(source_embedding, embeddings)
+        # Cosine similarity is a plain matmul on normalized embeddings
+        with inference_mode():
+            res = (source_embedding @ embeddings.T).cpu()
         return SentenceScores(res.tolist()[0])
 
     @SentenceSimilarityTasks.taskmethod()
@@ -249,20 +759,29 @@ class TextEmbedding(ModuleBase):
                 each SentenceScores contains the source-sentence's score for each sentence in order.
         """
 
-        for s in source_sentences:
-            self._prevent_truncation(s)
-        for s in sentences:
-            self._prevent_truncation(s)
+        texts = list(source_sentences) + list(sentences)
+        lengths = self._prevent_truncation_batch(texts)
 
-        source_embedding = self.model.encode(source_sentences)
-        embeddings = self.model.encode(sentences)
+        # Encode the source sentences along with the sentences in one pass (normalized)
+        embeddings = self._to_device(
+            self._encode_cached(texts, lengths, normalize_embeddings=True)
+        )
+        source_embedding = embeddings[: len(source_sentences)]
+        embeddings = embeddings[len(source_sentences):]
 
-        res = cos_sim(source_embedding, embeddings)
+        # Cosine similarity is a plain matmul on normalized embeddings
+        with inference_mode():
+            res = (source_embedding @ embeddings.T).cpu()
         float_list_list = res.tolist()
         return SentenceListScores(
             results=[SentenceScores(fl) for fl in float_list_list]
         )
 
+    @staticmethod
+    def _get_text(srd: JsonDict) -> str:
+        """Get a document's "text", else "_text", else default to an empty string"""
+        return srd.get("text") or srd.get("_text", "")
+
     @RerankTask.taskmethod()
     def run_rerank_query(
         self,
@@ -338,47 +857,56 @@ class TextEmbedding(ModuleBase):
         if top_n is None or top_n < 1:
             top_n = len(documents)
 
-        # Using input document dicts so get "text" else "_text" else default to ""
-        def get_text(srd):
-            return srd.get("text") or srd.get("_text", "")
-
-        doc_texts = [get_text(srd) for srd in documents]
-
-        for text in doc_texts:
-            self._prevent_truncation(text)
-        for query in queries:
-            self._prevent_truncation(query)
+        # Resolved once here and reused when returning text with the results
+        doc_texts = [self._get_text(srd) for srd in documents]
 
-        doc_embeddings = self.model.encode(doc_texts, convert_to_tensor=True)
-        doc_embeddings = doc_embeddings.to(self.model.device)
-        doc_embeddings = normalize_embeddings(doc_embeddings)
+        texts = list(queries) + doc_texts
+        lengths = self._prevent_truncation_batch(texts)
 
-        query_embeddings = self.model.encode(queries, convert_to_tensor=True)
-        query_embeddings = query_embeddings.to(self.model.device)
-        query_embeddings = normalize_embeddings(query_embeddings)
-
-        res = semantic_search(
-            query_embeddings, doc_embeddings, top_k=top_n, score_function=dot_score
+        # Encode queries along with documents in one pass (normalized, on the model device)
+        embeddings = self._to_device(
+            self._encode_cached(
+                texts,
+                lengths,
+                persistent=range(len(queries), len(texts)),
+                normalize_embeddings=True,
+            )
         )
-
-        # Fixup result dicts
-        for r in res:
-            for x in r:
-                # Renaming corpus_id to index
-                corpus_id = x.pop("corpus_id")
-                x["index"] = corpus_id
-                # Optionally adding the original document and/or just the text that was used
-                if return_documents:
-                    x["document"] = documents[corpus_id]
-                if return_text:
-                    x["text"] = get_text(documents[corpus_id])
-
-        def add_query(q):
-            return queries[q] if return_queries else None
-
+        query_embeddings = embeddings[: len(queries)]
+        doc_embeddings = embeddings[len(queries):]
+
+        if len(documents) <= RERANK_DIRECT_TOPK_MAX:
+            # Embeddings are normalized, so one matmul gives the cosine scores for every query
+            with inference_mode():
+                scores = query_embeddings @ doc_embeddings.T
+                top_vals, top_idx = topk(scores, k=min(top_n, scores.size(1)), dim=1)
+                top_idx, top_vals = self._to_host(top_idx, top_vals)
+            row_indices = top_idx.tolist()
+            row_scores = top_vals.tolist()
+        else:
+            # Large corpus so let semantic_search chunk it instead of one huge score matrix
+            with inference_mode():
+                res = semantic_search(
+                    query_embeddings, doc_embeddings, top_k=top_n, score_function=dot_score
+                )
+            row_indices = [[x["corpus_id"] for x in r] for r in res]
+            row_scores = [[x["score"] for x in r] for r in res]
+
+        # Optionally adding the original document and/or just the text that was used
         results = [
-            RerankQueryResult(query=add_query(q), scores=[RerankScore(**x) for x in r])
-            for q, r in enumerate(res)
+            RerankQueryResult(
+                query=queries[q] if return_queries else None,
+                scores=[
+                    RerankScore(
+                        index=i,
+                        score=score,
+                        document=documents[i] if return_documents else None,
+                        text=doc_texts[i] if return_text else None,
+                    )
+                    for i, score in zip(indices, values)
+                ],
+            )
+            for q, (indices, values) in enumerate(zip(row_indices, row_scores))
         ]
 
         return RerankPrediction(results=results)